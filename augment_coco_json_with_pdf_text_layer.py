@@ -1,9 +1,51 @@
 import os
+import io
 import json
 import argparse
+import re
+import multiprocessing
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from itertools import groupby
+from operator import itemgetter
 import fitz  # PyMuPDF
 from pathlib import Path
 
+# Optional: orjson reads and writes the JSON files several times faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Each PDF has its own layout folder and COCO JSON, so several PDFs are augmented at once
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 8)
+
+# Runs of digits in an image filename
+_DIGITS = re.compile(r'\d+')
+
+# Share of a word's area that must lie inside a bbox for the word to be extracted
+# (strictly more than this). At one half, a word cut by the edge between two
+# adjacent boxes goes to exactly one of them, while a box drawn tightly around the
+# glyphs of a line still covers about 70% of each word box (which includes the
+# font's full ascent and descent).
+MIN_WORD_OVERLAP = 0.5
+
+
+def _json_loads(data):
+    """Parse JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(data):
+    """Serialize to indented UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
 
 def find_coco_json(layout_folder):
     """Find COCO JSON file in the layout folder."""
@@ -21,131 +63,227 @@ def find_coco_json(layout_folder):
         return None
 
 
-def get_page_number_from_image_id(coco_data, image_id):
-    """Extract page number from image filename based on image_id."""
-    for image in coco_data.get('images', []):
-        if image['id'] == image_id:
-            filename = image['file_name']
-            # Try to extract page number from filename
-            # Common patterns: page_001.jpg, image_1.jpg, etc.
-            basename = os.path.splitext(os.path.basename(filename))[0]
-            
-            # Extract numbers from filename
-            numbers = ''.join(filter(str.isdigit, basename))
-            if numbers:
-                # Convert to 0-based page index
-                return int(numbers) - 1
-            else:
-                # Fallback: assume image_id corresponds to page number
-                return image_id - 1
+def get_page_number_from_filename(filename, image_id):
+    """Extract the 0-based page number from an image filename."""
+    # Try to extract page number from filename
+    # Common patterns: page_001.jpg, image_1.jpg, etc.
+    basename = os.path.splitext(os.path.basename(filename))[0]
+    
+    # Extract numbers from filename
+    numbers = ''.join(_DIGITS.findall(basename))
+    if numbers:
+        # Convert to 0-based page index
+        return int(numbers) - 1
+    else:
+        # Fallback: assume image_id corresponds to page number
+        return image_id - 1
+
+
+def build_image_page_map(coco_data):
+    """Map every image_id in the COCO data to its 0-based page number."""
+    return {
+        image['id']: get_page_number_from_filename(image['file_name'], image['id'])
+        for image in coco_data.get('images', [])
+    }
+
+
+def get_page_words(page):
+    """
+    Extract all words of a PDF page in a single pass.
     
-    # Fallback: assume image_id corresponds to page number
-    return image_id - 1
+    Args:
+        page: PyMuPDF page object
+    
+    Returns:
+        Tuple (words, tops, max_height): PyMuPDF word tuples
+        (x0, y0, x1, y1, word, block_no, line_no, word_no) sorted by their
+        top edge, the matching list of top edges, and the tallest word height
+    """
+    words = sorted(page.get_text("words"), key=itemgetter(1))
+    tops = [w[1] for w in words]
+    max_height = max((w[3] - w[1] for w in words), default=0)
+    return words, tops, max_height
 
 
-def extract_text_from_bbox(pdf_doc, page_num, bbox_coco):
+def extract_text_from_bbox(page_words, bbox_coco):
     """
-    Extract text from PDF using COCO bounding box coordinates.
+    Extract text from a PDF page using COCO bounding box coordinates.
+    
+    A word belongs to the bounding box if more than MIN_WORD_OVERLAP of its area
+    lies inside it, so words cut by the box edge are kept whole or left out
+    instead of being split, and never end up in two boxes that do not overlap.
     
     Args:
-        pdf_doc: PyMuPDF document object
-        page_num: Page number (0-based)
+        page_words: Words of the page as returned by get_page_words()
         bbox_coco: COCO bbox format [x, y, width, height]
     
     Returns:
         Extracted text as string
     """
-    if page_num >= pdf_doc.page_count:
+    words, tops, max_height = page_words
+    
+    # Empty or invalid boxes cannot contain any text
+    x, y, width, height = bbox_coco
+    if width <= 0 or height <= 0:
         return ""
     
-    page = pdf_doc[page_num]
+    # Convert COCO bbox [x, y, width, height] to [x0, y0, x1, y1]
+    x0, y0, x1, y1 = x, y, x + width, y + height
     
-    # Convert COCO bbox [x, y, width, height] to PyMuPDF rect [x0, y0, x1, y1]
-    x, y, width, height = bbox_coco
-    rect = fitz.Rect(x, y, x + width, y + height)
+    # Only words starting less than one word height above the box can reach into it
+    lo = bisect_left(tops, y0 - max_height)
+    hi = bisect_left(tops, y1)
     
-    # Extract text from the specified rectangle
-    text = page.get_text("text", clip=rect).strip()
+    selected = []
+    for w in words[lo:hi]:
+        overlap_w = min(x1, w[2]) - max(x0, w[0])
+        overlap_h = min(y1, w[3]) - max(y0, w[1])
+        if overlap_w <= 0 or overlap_h <= 0:
+            continue
+        area = (w[2] - w[0]) * (w[3] - w[1])
+        if overlap_w * overlap_h > MIN_WORD_OVERLAP * area:
+            selected.append(w)
+    
+    # Restore reading order and rebuild the lines of the text layer
+    selected.sort(key=itemgetter(5, 6, 7))
+    lines = groupby(selected, key=itemgetter(5, 6))
+    text = "\n".join(" ".join(w[4] for w in line_words) for _, line_words in lines)
     
     return text
 
 
-def process_pdf_layout_pair(pdf_path, layout_folder):
+def process_pdf_layout_pair(pdf_path, layout_folder, verbose=True):
     """Process a single PDF and its corresponding layout folder."""
     pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    print(f"\n=== Processing PDF: {pdf_name} ===")
+    
+    if verbose:
+        print(f"\n=== Processing PDF: {pdf_name} ===")
     
     # Check if layout folder exists
     if not os.path.exists(layout_folder):
-        print(f"WARNING: Layout folder not found: {layout_folder}")
+        if verbose:
+            print(f"WARNING: Layout folder not found: {layout_folder}")
         return False
     
     # Find COCO JSON file
     coco_json_path = find_coco_json(layout_folder)
     if not coco_json_path:
-        print(f"WARNING: No JSON file found in {layout_folder}")
+        if verbose:
+            print(f"WARNING: No JSON file found in {layout_folder}")
         return False
     
-    print(f"Found COCO JSON: {coco_json_path}")
+    if verbose:
+        print(f"Found COCO JSON: {coco_json_path}")
     
     # Load COCO JSON
     try:
-        with open(coco_json_path, 'r', encoding='utf-8') as f:
-            coco_data = json.load(f)
+        with open(coco_json_path, 'rb') as f:
+            coco_data = _json_loads(f.read())
     except Exception as e:
-        print(f"ERROR: Failed to load JSON file: {e}")
+        if verbose:
+            print(f"ERROR: Failed to load JSON file: {e}")
         return False
     
     # Open PDF
     try:
         pdf_doc = fitz.open(pdf_path)
-        print(f"Opened PDF with {pdf_doc.page_count} pages")
+        if verbose:
+            print(f"Opened PDF with {pdf_doc.page_count} pages")
     except Exception as e:
-        print(f"ERROR: Failed to open PDF: {e}")
+        if verbose:
+            print(f"ERROR: Failed to open PDF: {e}")
         return False
     
     # Process annotations
     annotations = coco_data.get('annotations', [])
-    print(f"Processing {len(annotations)} annotations...")
+    if verbose:
+        print(f"Processing {len(annotations)} annotations...")
     
     updated_count = 0
     
-    for i, annotation in enumerate(annotations):
-        if i % 50 == 0 and i > 0:
+    # Resolve each image's page number once instead of once per annotation
+    image_id_to_page = build_image_page_map(coco_data)
+    
+    # Get the page number of every annotation from its image_id
+    # (fallback: assume image_id corresponds to page number)
+    annotation_pages = [
+        image_id_to_page.get(a['image_id'], a['image_id'] - 1) for a in annotations
+    ]
+    
+    # Visit the annotations page by page so that the words of every PDF page
+    # are extracted once (the order of the annotations in the JSON is left untouched)
+    page_order = sorted(range(len(annotations)), key=annotation_pages.__getitem__)
+    
+    page_words = None
+    loaded_page_num = None
+    
+    # Text already extracted on the current page, keyed by the rounded bbox
+    # (layouts often repeat the same box)
+    page_text_cache = {}
+    
+    for i, index in enumerate(page_order):
+        if verbose and i % 50 == 0 and i > 0:
             print(f"  Processed {i}/{len(annotations)} annotations...")
         
-        image_id = annotation['image_id']
+        annotation = annotations[index]
         bbox = annotation['bbox']
-        
-        # Get page number from image_id
-        page_num = get_page_number_from_image_id(coco_data, image_id)
+        page_num = annotation_pages[index]
         
         # Extract text from PDF
         try:
-            extracted_text = extract_text_from_bbox(pdf_doc, page_num, bbox)
+            if page_num != loaded_page_num:
+                page_words = None
+                page_text_cache = {}
+                loaded_page_num = page_num
+                if page_num < pdf_doc.page_count:
+                    page_words = get_page_words(pdf_doc[page_num])
+            
+            bbox_key = tuple(round(c, 1) for c in bbox)
+            extracted_text = page_text_cache.get(bbox_key)
+            if extracted_text is None:
+                extracted_text = extract_text_from_bbox(page_words, bbox) if page_words is not None else ""
+                page_text_cache[bbox_key] = extracted_text
             annotation['original_pdf_text_layer'] = extracted_text
             updated_count += 1
             
-            if extracted_text and len(extracted_text) > 50:
+            if verbose and extracted_text and len(extracted_text) > 50:
                 print(f"    Annotation {annotation['id']}: Extracted {len(extracted_text)} characters")
             
         except Exception as e:
-            print(f"WARNING: Failed to extract text for annotation {annotation['id']}: {e}")
+            if verbose:
+                print(f"WARNING: Failed to extract text for annotation {annotation['id']}: {e}")
             annotation['original_pdf_text_layer'] = ""
     
     pdf_doc.close()
     
     # Save updated COCO JSON
     try:
-        with open(coco_json_path, 'w', encoding='utf-8') as f:
-            json.dump(coco_data, f, indent=2, ensure_ascii=False)
-        print(f"SUCCESS: Updated {updated_count} annotations in {coco_json_path}")
+        with open(coco_json_path, 'wb') as f:
+            f.write(_json_dumps(coco_data))
+        if verbose:
+            print(f"SUCCESS: Updated {updated_count} annotations in {coco_json_path}")
         return True
     except Exception as e:
-        print(f"ERROR: Failed to save updated JSON: {e}")
+        if verbose:
+            print(f"ERROR: Failed to save updated JSON: {e}")
         return False
 
 
+def _process_pdf_task(task):
+    """
+    Worker entry point: add the text layer of one PDF to the COCO JSON of its layout folder.
+    
+    Returns (pdf_name, success, output), where output holds everything the
+    augmentation printed; main() prints it once the PDF is done.
+    """
+    pdf_path, layout_folder, verbose = task
+    pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        success = process_pdf_layout_pair(pdf_path, layout_folder, verbose)
+    return pdf_name, success, buffer.getvalue()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Augment COCO JSON annotations with text extracted from PDF text layer"
@@ -154,9 +292,18 @@ def main():
                         help="Directory containing PDF files")
     parser.add_argument("layout_directory", 
                         help="Directory containing layout folders with COCO JSON files")
+    parser.add_argument("--quiet", "-q", 
+                        action="store_true",
+                        help="Disable verbose output")
+    parser.add_argument("--workers", "-j",
+                        type=int,
+                        default=DEFAULT_WORKERS,
+                        help=f"Number of PDFs to process in parallel (default: {DEFAULT_WORKERS})")
     
     args = parser.parse_args()
     
+    verbose = not args.quiet
+    
     # Validate directories
     if not os.path.exists(args.pdf_directory):
         print(f"ERROR: PDF directory does not exist: {args.pdf_directory}")
@@ -166,8 +313,9 @@ def main():
         print(f"ERROR: Layout directory does not exist: {args.layout_directory}")
         return 1
     
-    print(f"PDF Directory: {args.pdf_directory}")
-    print(f"Layout Directory: {args.layout_directory}")
+    if verbose:
+        print(f"PDF Directory: {args.pdf_directory}")
+        print(f"Layout Directory: {args.layout_directory}")
     
     # Find all PDF files (not recursive)
     pdf_files = [f for f in os.listdir(args.pdf_directory) if f.lower().endswith('.pdf')]
@@ -176,27 +324,40 @@ def main():
         print("WARNING: No PDF files found in the specified directory")
         return 1
     
-    print(f"\nFound {len(pdf_files)} PDF files to process")
+    if verbose:
+        print(f"\nFound {len(pdf_files)} PDF files to process")
     
-    success_count = 0
     total_count = len(pdf_files)
     
-    # Process each PDF
+    # Pair each PDF with its layout folder
+    tasks = []
     for pdf_file in pdf_files:
         pdf_path = os.path.join(args.pdf_directory, pdf_file)
         pdf_name = os.path.splitext(pdf_file)[0]
         layout_folder = os.path.join(args.layout_directory, pdf_name)
-        
-        if process_pdf_layout_pair(pdf_path, layout_folder):
-            success_count += 1
+        tasks.append((pdf_path, layout_folder, verbose))
+    
+    # Process the PDFs in parallel (PyMuPDF holds the GIL, so use processes)
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        results = []
+        for pdf_name, success, output in executor.map(_process_pdf_task, tasks):
+            print(output, end="")
+            results.append((pdf_name, success))
+    
+    failed_pdfs = [pdf_name for pdf_name, success in results if not success]
+    success_count = total_count - len(failed_pdfs)
     
-    print(f"\n=== SUMMARY ===")
-    print(f"Total PDFs processed: {total_count}")
-    print(f"Successfully processed: {success_count}")
-    print(f"Failed: {total_count - success_count}")
+    if verbose:
+        print(f"\n=== SUMMARY ===")
+        print(f"Total PDFs processed: {total_count}")
+        print(f"Successfully processed: {success_count}")
+        print(f"Failed: {total_count - success_count}")
+        if failed_pdfs:
+            print(f"Failed PDFs: {', '.join(failed_pdfs)}")
     
     return 0
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
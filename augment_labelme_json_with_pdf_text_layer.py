@@ -1,29 +1,57 @@
 import os
+import io
 import json
 import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from operator import itemgetter
 import fitz  # PyMuPDF
 from pathlib import Path
 import re
 
+# Optional: orjson reads and writes the JSON files several times faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def extract_text_from_labelme_bbox(pdf_doc, page_num, labelme_points, image_width, image_height):
+
+# PDFs are independent, so they are processed in parallel worker processes
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 8)
+
+# LabelMe page JSON filenames (page_1.json, page_2.json, ...)
+_PAGE_RE = re.compile(r'page_(\d+)\.json', re.IGNORECASE)
+
+# Page JSONs read ahead / written in the background while a PDF is processed
+JSON_IO_THREADS = 4
+
+# Pages processed between two flushes of MuPDF's resource store (fonts,
+# images), which otherwise keeps growing on large scanned PDFs
+STORE_SHRINK_INTERVAL = 50
+
+# PDF opened by each page worker process (see _open_pdf_for_worker)
+_worker_pdf_doc = None
+_worker_pages_processed = 0
+
+
+def extract_text_from_labelme_bbox(page, labelme_points, image_width, image_height, rect=None):
     """
-    Extract text from PDF using LabelMe bounding box coordinates.
+    Extract text from a PDF page using LabelMe bounding box coordinates.
     
     Args:
-        pdf_doc: PyMuPDF document object
-        page_num: Page number (0-based)
+        page: PyMuPDF page object
         labelme_points: LabelMe points format [[x1,y1], [x2,y2]]
         image_width: Original image width in pixels
         image_height: Original image height in pixels
+        rect: Optional fitz.Rect to reuse for the clip area instead of
+            allocating a new one for every shape
     
     Returns:
         Extracted text as string
     """
-    if page_num >= pdf_doc.page_count:
-        return ""
-    
-    page = pdf_doc[page_num]
     pdf_rect = page.rect  # Get PDF page dimensions
     
     # Convert LabelMe image coordinates to PDF coordinates
@@ -33,18 +61,24 @@ def extract_text_from_labelme_bbox(pdf_doc, page_num, labelme_points, image_widt
     img_x0, img_y0 = min(point1[0], point2[0]), min(point1[1], point2[1])
     img_x1, img_y1 = max(point1[0], point2[0]), max(point1[1], point2[1])
     
+    # Empty boxes (coinciding points) cannot contain any text
+    if img_x1 <= img_x0 or img_y1 <= img_y0:
+        return ""
+    
     # Calculate scaling factors
     scale_x = pdf_rect.width / image_width
     scale_y = pdf_rect.height / image_height
     
-    # Convert to PDF coordinates (scaling and coordinate system conversion)
-    pdf_x0 = img_x0 * scale_x
-    pdf_y0 = img_y0 * scale_y  # PDF uses same top-left origin for this conversion
-    pdf_x1 = img_x1 * scale_x
-    pdf_y1 = img_y1 * scale_y
+    # Create rectangle for text extraction, converted to PDF coordinates
+    # (scaling only: PDF uses same top-left origin for this conversion)
+    if rect is None:
+        rect = fitz.Rect()
+    rect.x0, rect.y0 = img_x0 * scale_x, img_y0 * scale_y
+    rect.x1, rect.y1 = img_x1 * scale_x, img_y1 * scale_y
     
-    # Create rectangle for text extraction
-    rect = fitz.Rect(pdf_x0, pdf_y0, pdf_x1, pdf_y1)
+    # Neither can boxes lying entirely outside the page
+    if rect.x0 >= pdf_rect.x1 or rect.y0 >= pdf_rect.y1 or rect.x1 <= pdf_rect.x0 or rect.y1 <= pdf_rect.y0:
+        return ""
     
     # Extract text from the specified rectangle
     text = page.get_text("text", clip=rect).strip()
@@ -67,21 +101,134 @@ def get_page_json_files(images_dir):
     if not os.path.exists(images_dir):
         return []
     
-    for filename in os.listdir(images_dir):
-        if filename.lower().endswith('.json'):
-            # Extract page number using regex
-            match = re.match(r'page_(\d+)\.json', filename, re.IGNORECASE)
-            if match:
-                page_num = int(match.group(1))
-                filepath = os.path.join(images_dir, filename)
-                json_files.append((page_num, filepath))
+    with os.scandir(images_dir) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith('.json'):
+                # Extract page number using regex
+                match = _PAGE_RE.match(entry.name)
+                if match:
+                    page_num = int(match.group(1))
+                    json_files.append((page_num, entry.path))
     
     # Sort by page number (not lexicographically)
-    json_files.sort(key=lambda x: x[0])
+    json_files.sort(key=itemgetter(0))
     
     return json_files
 
 
+def _json_loads(data):
+    """Parse JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(data):
+    """Serialize to indented UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def load_labelme_json(json_path):
+    """Read a LabelMe JSON file."""
+    with open(json_path, 'rb') as f:
+        return _json_loads(f.read())
+
+
+def save_labelme_json(json_path, data):
+    """Write a LabelMe JSON file."""
+    with open(json_path, 'wb') as f:
+        f.write(_json_dumps(data))
+
+
+def add_pdf_text_to_labelme_data(data, json_path, pdf_doc, page_num, verbose=True):
+    """
+    Add PDF text layer information to the shapes of a loaded LabelMe JSON.
+    
+    Args:
+        data: LabelMe JSON data, updated in place
+        json_path: Path of the LabelMe JSON file (used in messages)
+        pdf_doc: PyMuPDF document object
+        page_num: PDF page number (0-based)
+        verbose: Whether to print verbose output
+    
+    Returns:
+        Number of shapes processed, or None if the data is not a LabelMe
+        annotation with image dimensions (and should not be saved)
+    """
+    # Check if this is a LabelMe JSON (should have 'shapes' key)
+    if 'shapes' not in data:
+        if verbose:
+            print(f"    WARNING: Not a LabelMe JSON (no 'shapes' key): {os.path.basename(json_path)}")
+        return None
+    
+    # Get image dimensions from JSON
+    image_width = data.get('imageWidth', 0)
+    image_height = data.get('imageHeight', 0)
+    
+    if image_width == 0 or image_height == 0:
+        if verbose:
+            print(f"    WARNING: No image dimensions found in {os.path.basename(json_path)}")
+        return None
+    
+    shapes_processed = 0
+    
+    # Load the page once and reuse one clip rectangle for all shapes
+    page = pdf_doc[page_num] if page_num < pdf_doc.page_count else None
+    rect = fitz.Rect()
+    
+    # Text already extracted on this page, keyed by the rounded box corners
+    # (layouts often repeat the same box)
+    text_cache = {}
+    
+    # Process each shape
+    for shape in data.get('shapes', []):
+        if 'points' in shape and len(shape['points']) >= 2:
+            # Extract text from PDF using the shape's bounding box
+            try:
+                point1, point2 = shape['points'][0], shape['points'][1]
+                box_key = (round(point1[0], 1), round(point1[1], 1), round(point2[0], 1), round(point2[1], 1))
+                extracted_text = text_cache.get(box_key)
+                if extracted_text is None:
+                    extracted_text = ""
+                    if page is not None:
+                        extracted_text = extract_text_from_labelme_bbox(
+                            page, shape['points'], image_width, image_height, rect
+                        )
+                    text_cache[box_key] = extracted_text
+                shape['original_pdf_text_layer'] = extracted_text
+                shapes_processed += 1
+                
+                if verbose and extracted_text and len(extracted_text) > 30:
+                    print(f"      Shape '{shape.get('label', 'unknown')}': Extracted {len(extracted_text)} characters")
+                elif verbose and extracted_text:
+                    # Show shorter text extracts
+                    preview = extracted_text.replace('\n', ' ')[:50]
+                    print(f"      Shape '{shape.get('label', 'unknown')}': '{preview}{'...' if len(extracted_text) > 50 else ''}'")
+                
+            except Exception as e:
+                if verbose:
+                    print(f"      WARNING: Failed to extract text for shape: {e}")
+                shape['original_pdf_text_layer'] = ""
+        else:
+            if verbose:
+                print(f"      WARNING: Shape missing valid 'points' data")
+            shape['original_pdf_text_layer'] = ""
+    
+    return shapes_processed
+
+
+def _report_labelme_json_error(json_path, error, verbose):
+    """Print the error raised while processing a LabelMe JSON file and return -1."""
+    if verbose:
+        if isinstance(error, json.JSONDecodeError):
+            print(f"    ERROR: Invalid JSON format in {json_path}: {error}")
+        else:
+            print(f"    ERROR: Failed to process {json_path}: {error}")
+    return -1
+
+
 def process_labelme_json(json_path, pdf_doc, page_num, verbose=True):
     """
     Process a single LabelMe JSON file and add PDF text layer information.
@@ -96,75 +243,119 @@ def process_labelme_json(json_path, pdf_doc, page_num, verbose=True):
         Number of shapes processed, or -1 if error
     """
     try:
-        # Read the JSON file
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Check if this is a LabelMe JSON (should have 'shapes' key)
-        if 'shapes' not in data:
-            if verbose:
-                print(f"    WARNING: Not a LabelMe JSON (no 'shapes' key): {os.path.basename(json_path)}")
-            return 0
-        
-        # Get image dimensions from JSON
-        image_width = data.get('imageWidth', 0)
-        image_height = data.get('imageHeight', 0)
+        data = load_labelme_json(json_path)
         
-        if image_width == 0 or image_height == 0:
-            if verbose:
-                print(f"    WARNING: No image dimensions found in {os.path.basename(json_path)}")
+        shapes_processed = add_pdf_text_to_labelme_data(data, json_path, pdf_doc, page_num, verbose)
+        if shapes_processed is None:
             return 0
         
-        shapes_processed = 0
-        
-        # Process each shape
-        for shape in data.get('shapes', []):
-            if 'points' in shape and len(shape['points']) >= 2:
-                # Extract text from PDF using the shape's bounding box
-                try:
-                    extracted_text = extract_text_from_labelme_bbox(
-                        pdf_doc, page_num, shape['points'], image_width, image_height
-                    )
-                    shape['original_pdf_text_layer'] = extracted_text
-                    shapes_processed += 1
-                    
-                    if verbose and extracted_text and len(extracted_text) > 30:
-                        print(f"      Shape '{shape.get('label', 'unknown')}': Extracted {len(extracted_text)} characters")
-                    elif verbose and extracted_text:
-                        # Show shorter text extracts
-                        preview = extracted_text.replace('\n', ' ')[:50]
-                        print(f"      Shape '{shape.get('label', 'unknown')}': '{preview}{'...' if len(extracted_text) > 50 else ''}'")
-                    
-                except Exception as e:
-                    if verbose:
-                        print(f"      WARNING: Failed to extract text for shape: {e}")
-                    shape['original_pdf_text_layer'] = ""
-            else:
-                if verbose:
-                    print(f"      WARNING: Shape missing valid 'points' data")
-                shape['original_pdf_text_layer'] = ""
-        
         # Save the updated JSON
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        if verbose and shapes_processed > 0:
-            print(f"    Updated {shapes_processed} shapes in {os.path.basename(json_path)}")
-        
-        return shapes_processed
+        save_labelme_json(json_path, data)
         
-    except json.JSONDecodeError as e:
-        if verbose:
-            print(f"    ERROR: Invalid JSON format in {json_path}: {e}")
-        return -1
     except Exception as e:
+        return _report_labelme_json_error(json_path, e, verbose)
+    
+    if verbose and shapes_processed > 0:
+        print(f"    Updated {shapes_processed} shapes in {os.path.basename(json_path)}")
+    
+    return shapes_processed
+
+
+def process_labelme_jsons_pipelined(page_tasks, pdf_doc, verbose=True):
+    """
+    Process page JSONs of one PDF, overlapping file I/O with text extraction.
+    
+    The text is extracted on the calling thread (the PDF must not be shared
+    between threads) while a small thread pool reads the next JSON_IO_THREADS
+    page JSONs ahead and writes the updated ones in the background.
+    
+    Args:
+        page_tasks: List of (json_path, page_num) tuples, page_num 0-based
+        pdf_doc: PyMuPDF document object
+        verbose: Whether to print verbose output
+    
+    Returns:
+        List with the result of process_labelme_json() for every page
+    """
+    results = [0] * len(page_tasks)
+    saves = []
+    
+    with ThreadPoolExecutor(max_workers=JSON_IO_THREADS) as io_pool:
+        loads = deque(io_pool.submit(load_labelme_json, json_path)
+                      for json_path, _ in page_tasks[:JSON_IO_THREADS])
+        
+        for index, (json_path, page_num) in enumerate(page_tasks):
+            load = loads.popleft()
+            if index + JSON_IO_THREADS < len(page_tasks):
+                loads.append(io_pool.submit(load_labelme_json, page_tasks[index + JSON_IO_THREADS][0]))
+            
+            if index > 0 and index % STORE_SHRINK_INTERVAL == 0:
+                fitz.TOOLS.store_shrink(100)
+            
+            if verbose:
+                print(f"  Processing {os.path.basename(json_path)} (PDF page {page_num + 1})")
+            
+            try:
+                data = load.result()
+                shapes_processed = add_pdf_text_to_labelme_data(data, json_path, pdf_doc, page_num, verbose)
+            except Exception as e:
+                results[index] = _report_labelme_json_error(json_path, e, verbose)
+                continue
+            
+            if shapes_processed is None:
+                continue
+            
+            results[index] = shapes_processed
+            saves.append((index, json_path, io_pool.submit(save_labelme_json, json_path, data)))
+            
+            if verbose and shapes_processed > 0:
+                print(f"    Updated {shapes_processed} shapes in {os.path.basename(json_path)}")
+    
+    for index, json_path, save in saves:
+        try:
+            save.result()
+        except Exception as e:
+            results[index] = _report_labelme_json_error(json_path, e, verbose)
+    
+    return results
+
+
+def _open_pdf_for_worker(pdf_path):
+    """Pool initializer: open the PDF once in each page worker process."""
+    global _worker_pdf_doc
+    _worker_pdf_doc = fitz.open(pdf_path, filetype="pdf")
+
+
+def _process_page_task(task):
+    """
+    Worker entry point: process one page JSON against the worker's copy of the PDF.
+    
+    Returns the shape count and the captured messages, which the parent prints
+    in page order.
+    """
+    global _worker_pages_processed
+    json_path, page_num, verbose = task
+    
+    if _worker_pages_processed > 0 and _worker_pages_processed % STORE_SHRINK_INTERVAL == 0:
+        fitz.TOOLS.store_shrink(100)
+    _worker_pages_processed += 1
+    
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
         if verbose:
-            print(f"    ERROR: Failed to process {json_path}: {e}")
-        return -1
+            print(f"  Processing {os.path.basename(json_path)} (PDF page {page_num + 1})")
+        shapes_processed = process_labelme_json(json_path, _worker_pdf_doc, page_num, verbose)
+    return shapes_processed, buffer.getvalue()
 
 
-def process_pdf_layout_pair(pdf_path, layout_folder, verbose=True):
-    """Process a single PDF and its corresponding layout folder."""
+def process_pdf_layout_pair(pdf_path, layout_folder, verbose=True, page_workers=1):
+    """
+    Process a single PDF and its corresponding layout folder.
+    
+    With page_workers > 1 the page JSONs are processed in parallel worker
+    processes, each holding its own copy of the PDF (fitz.Document can be
+    neither pickled nor shared between threads).
+    """
     pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
     
     if verbose:
@@ -199,7 +390,7 @@ def process_pdf_layout_pair(pdf_path, layout_folder, verbose=True):
     
     # Open PDF
     try:
-        pdf_doc = fitz.open(pdf_path)
+        pdf_doc = fitz.open(pdf_path, filetype="pdf")
         pdf_page_count = pdf_doc.page_count
         if verbose:
             print(f"Opened PDF with {pdf_page_count} pages")
@@ -214,25 +405,45 @@ def process_pdf_layout_pair(pdf_path, layout_folder, verbose=True):
             print(f"WARNING: Page count mismatch! PDF has {pdf_page_count} pages, but found {len(page_json_files)} JSON files")
             print(f"This might indicate missing or extra JSON files")
     
-    # Process each page JSON
-    total_shapes_processed = 0
+    # Collect the page JSONs that refer to existing PDF pages
+    page_tasks = []
     
     for page_num_1based, json_path in page_json_files:
         page_num_0based = page_num_1based - 1  # Convert to 0-based for PDF
         
-        if verbose:
-            print(f"  Processing page_{page_num_1based}.json (PDF page {page_num_0based + 1})")
-        
         if page_num_0based >= pdf_page_count:
             if verbose:
                 print(f"    WARNING: JSON file page_{page_num_1based}.json refers to page {page_num_1based} but PDF only has {pdf_page_count} pages")
             continue
         
-        shapes_processed = process_labelme_json(json_path, pdf_doc, page_num_0based, verbose)
-        if shapes_processed > 0:
-            total_shapes_processed += shapes_processed
+        page_tasks.append((json_path, page_num_0based))
     
-    pdf_doc.close()
+    # Process each page JSON
+    if page_workers > 1 and len(page_tasks) > 1:
+        pdf_doc.close()
+        results = []
+        try:
+            with ProcessPoolExecutor(max_workers=page_workers,
+                                     initializer=_open_pdf_for_worker,
+                                     initargs=(pdf_path,)) as executor:
+                for shapes_processed, output in executor.map(_process_page_task,
+                                                             [task + (verbose,) for task in page_tasks]):
+                    print(output, end="")
+                    results.append(shapes_processed)
+        except BrokenProcessPool as e:
+            # A page worker could not open the PDF or died; only this PDF fails
+            if verbose:
+                print(f"ERROR: Page worker processes failed after {len(results)} of "
+                      f"{len(page_tasks)} pages: {e}")
+            return False
+    else:
+        results = process_labelme_jsons_pipelined(page_tasks, pdf_doc, verbose)
+        pdf_doc.close()
+        
+        # Resources of the closed PDF would otherwise stay cached in this process
+        fitz.TOOLS.store_shrink(100)
+    
+    total_shapes_processed = sum(n for n in results if n > 0)
     
     if verbose:
         print(f"SUCCESS: Processed {total_shapes_processed} shapes across {len(page_json_files)} pages")
@@ -240,6 +451,21 @@ def process_pdf_layout_pair(pdf_path, layout_folder, verbose=True):
     return True
 
 
+def _process_pdf_task(task):
+    """
+    Worker entry point: process one PDF/layout folder pair in a child process.
+    
+    The messages are captured and returned so that the parent prints each PDF's
+    log as one block instead of interleaving the output of parallel workers.
+    """
+    pdf_path, layout_folder, verbose, page_workers = task
+    pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        success = process_pdf_layout_pair(pdf_path, layout_folder, verbose, page_workers)
+    return pdf_name, success, buffer.getvalue()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Augment LabelMe JSON annotations with text extracted from PDF text layer"
@@ -251,6 +477,16 @@ def main():
     parser.add_argument("--quiet", "-q", 
                         action="store_true",
                         help="Disable verbose output")
+    parser.add_argument("--workers", "-j",
+                        type=int,
+                        default=DEFAULT_WORKERS,
+                        help=f"Number of PDFs to process in parallel (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--page-workers",
+                        type=int,
+                        default=1,
+                        help="Number of worker processes per PDF for the page JSONs; "
+                             "useful for a few very large PDFs, e.g. with --workers 1. Limited so "
+                             "that workers x page workers do not exceed the CPUs (default: 1)")
     
     args = parser.parse_args()
     
@@ -279,26 +515,45 @@ def main():
     if verbose:
         print(f"\nFound {len(pdf_files)} PDF files to process")
     
-    success_count = 0
     total_count = len(pdf_files)
     
-    # Process each PDF
+    # Every PDF worker starts its own page workers, so keep the total within the CPUs
+    workers = max(1, args.workers)
+    cpu_count = os.cpu_count() or 1
+    page_workers = max(1, min(args.page_workers, cpu_count // min(workers, total_count)))
+    if page_workers < args.page_workers:
+        print(f"WARNING: --page-workers lowered from {args.page_workers} to {page_workers} "
+              f"({cpu_count} CPUs shared by {min(workers, total_count)} PDF workers)")
+    
+    # Pair each PDF with its layout folder
+    tasks = []
     for pdf_file in pdf_files:
         pdf_path = os.path.join(args.pdf_directory, pdf_file)
         pdf_name = os.path.splitext(pdf_file)[0]
         layout_folder = os.path.join(args.layout_directory, pdf_name)
-        
-        if process_pdf_layout_pair(pdf_path, layout_folder, verbose):
-            success_count += 1
+        tasks.append((pdf_path, layout_folder, verbose, page_workers))
+    
+    # Process the PDFs in parallel (PyMuPDF holds the GIL, so use processes)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = []
+        for pdf_name, success, output in executor.map(_process_pdf_task, tasks):
+            print(output, end="")
+            results.append((pdf_name, success))
+    
+    failed_pdfs = [pdf_name for pdf_name, success in results if not success]
+    success_count = total_count - len(failed_pdfs)
     
     if verbose:
         print(f"\n=== SUMMARY ===")
         print(f"Total PDFs processed: {total_count}")
         print(f"Successfully processed: {success_count}")
         print(f"Failed: {total_count - success_count}")
+        if failed_pdfs:
+            print(f"Failed PDFs: {', '.join(failed_pdfs)}")
     
     return 0
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
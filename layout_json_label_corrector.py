@@ -1,8 +1,17 @@
 import os
 import json
 import argparse
+import multiprocessing
+from collections import Counter
+from functools import partial
 from pathlib import Path
 
+# Optional: orjson reads and writes the JSON files several times faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 #
 # This script recursively processes LabelMe JSON files in a given directory,
 # correcting labels based on predefined mappings from 'labels_bad' to 'labels_good'
@@ -35,6 +44,20 @@ labels_good = [
 ]
 
 
+def _json_loads(data):
+    """Parse JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(data):
+    """Serialize to indented UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
 def create_label_mapping():
     """Create a dictionary mapping bad labels to good labels."""
     if len(labels_bad) != len(labels_good):
@@ -66,30 +89,32 @@ def correct_labels_in_json(json_path, label_mapping):
     """
     try:
         # Read the JSON file
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(json_path, 'rb') as f:
+            data = _json_loads(f.read())
         
         # Check if this is a LabelMe JSON (should have 'shapes' key)
         if 'shapes' not in data:
             return 0  # Not a LabelMe JSON, skip silently
         
-        corrections_made = 0
+        # Count the corrections per (original label, new label) pair
+        corrections = Counter()
         
         # Process each shape
-        for shape in data.get('shapes', []):
-            if 'label' in shape:
-                original_label = shape['label']
-                if original_label in label_mapping:
-                    new_label = label_mapping[original_label]
-                    shape['label'] = new_label
-                    corrections_made += 1
-                    print(f"    Corrected: '{original_label}' -> '{new_label}'")
+        for shape in data.get('shapes', ()):
+            original_label = shape.get('label')
+            new_label = label_mapping.get(original_label)
+            if new_label is not None and new_label != original_label:
+                shape['label'] = new_label
+                corrections[(original_label, new_label)] += 1
+        
+        corrections_made = sum(corrections.values())
         
         # Save the corrected JSON if any changes were made
         if corrections_made > 0:
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            print(f"  Saved {corrections_made} corrections to {json_path}")
+            with open(json_path, 'wb') as f:
+                f.write(_json_dumps(data))
+            summary = ", ".join(f"'{old}' -> '{new}' x{count}" for (old, new), count in corrections.items())
+            print(f"  Saved {corrections_made} corrections to {json_path}: {summary}")
         
         return corrections_made
         
@@ -101,13 +126,38 @@ def correct_labels_in_json(json_path, label_mapping):
         return -1
 
 
-def process_directory(input_dir, label_mapping):
+def iter_json_files(root_dir):
+    """
+    Recursively yield the paths of all JSON files below root_dir.
+    
+    Unreadable directories are skipped, as with os.walk.
+    """
+    try:
+        entries = os.scandir(root_dir)
+    except OSError:
+        return
+    
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_json_files(entry.path)
+            elif entry.name.lower().endswith('.json'):
+                yield entry.path
+
+
+def _correct_labels_task(json_path, label_mapping):
+    """Worker entry point: correct one JSON file and report its path with the result."""
+    return json_path, correct_labels_in_json(json_path, label_mapping)
+
+
+def process_directory(input_dir, label_mapping, workers=None):
     """
     Recursively process all JSON files in the input directory.
     
     Args:
         input_dir: Root directory to process
         label_mapping: Dictionary mapping bad labels to good labels
+        workers: Number of worker processes (default: number of CPUs)
     
     Returns:
         Tuple of (total_files_processed, total_corrections_made, files_with_errors)
@@ -118,27 +168,14 @@ def process_directory(input_dir, label_mapping):
     
     print(f"\nScanning directory recursively: {input_dir}")
     
-    # Walk through all subdirectories
-    for root, dirs, files in os.walk(input_dir):
-        json_files = [f for f in files if f.lower().endswith('.json')]
-        
-        if json_files:
-            rel_path = os.path.relpath(root, input_dir)
-            if rel_path == '.':
-                print(f"\nProcessing root directory:")
-            else:
-                print(f"\nProcessing directory: {rel_path}")
-        
-        for json_file in json_files:
-            json_path = os.path.join(root, json_file)
-            print(f"  Processing: {json_file}")
-            
-            corrections = correct_labels_in_json(json_path, label_mapping)
-            
+    # Correct the files in parallel as the directory tree is scanned
+    task = partial(_correct_labels_task, label_mapping=label_mapping)
+    with multiprocessing.Pool(workers) as pool:
+        for json_path, corrections in pool.imap_unordered(task, iter_json_files(input_dir), chunksize=32):
             if corrections == -1:
                 files_with_errors += 1
             elif corrections == 0:
-                print(f"    No corrections needed")
+                print(f"  No corrections needed: {os.path.relpath(json_path, input_dir)}")
             else:
                 total_corrections_made += corrections
             
@@ -153,6 +190,10 @@ def main():
     )
     parser.add_argument("input_folder", 
                         help="Root directory to recursively search for LabelMe JSON files")
+    parser.add_argument("--workers", "-j",
+                        type=int,
+                        default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: number of CPUs)")
     
     args = parser.parse_args()
     
@@ -177,7 +218,7 @@ def main():
         return 1
     
     # Process all JSON files
-    total_files, total_corrections, error_files = process_directory(args.input_folder, label_mapping)
+    total_files, total_corrections, error_files = process_directory(args.input_folder, label_mapping, max(1, args.workers))
     
     # Print summary
     print(f"\n=== SUMMARY ===")
@@ -194,4 +235,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
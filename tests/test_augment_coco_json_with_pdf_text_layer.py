@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+import fitz  # PyMuPDF
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from augment_coco_json_with_pdf_text_layer import extract_text_from_bbox, get_page_words
+
+
+@pytest.fixture
+def page_words():
+    """Words of a page with two lines of 12 pt text starting at x=130."""
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_text((130, 100), "alpha beta gamma delta", fontsize=12)
+    page.insert_text((130, 116), "second line here", fontsize=12)
+    yield get_page_words(page)
+    doc.close()
+
+
+def _word_box(page_words, text):
+    words, _, _ = page_words
+    return next(w[:4] for w in words if w[4] == text)
+
+
+def test_word_on_the_edge_of_adjacent_boxes_goes_to_one_box(page_words):
+    x0, _, x1, _ = _word_box(page_words, "gamma")
+    for split in (x0 + 0.3 * (x1 - x0), (x0 + x1) / 2 + 0.1, x0 + 0.7 * (x1 - x0)):
+        left = extract_text_from_bbox(page_words, [72, 85, split - 72, 40])
+        right = extract_text_from_bbox(page_words, [split, 85, 400 - split, 40])
+        assert (left.split() + right.split()).count("gamma") == 1
+
+
+def test_tight_line_box_keeps_its_words(page_words):
+    # Box around the glyphs of the first line only, not the full ascent and descent
+    assert extract_text_from_bbox(page_words, [128, 91, 200, 12]) == "alpha beta gamma delta"
+
+
+def test_box_around_both_lines_keeps_the_line_breaks(page_words):
+    assert extract_text_from_bbox(page_words, [120, 80, 300, 45]) == \
+        "alpha beta gamma delta\nsecond line here"
+
+
+def test_empty_box_extracts_nothing(page_words):
+    assert extract_text_from_bbox(page_words, [130, 90, 0, 20]) == ""
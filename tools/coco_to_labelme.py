@@ -1,14 +1,109 @@
 #this script generates LabelMe compatible input data from COCO jsons
 import json
 import os
-import cv2
 import sys
+from PIL import Image
 from collections import defaultdict
-
-def coco_to_labelme(coco_json_path, images_dir, output_dir):
+from concurrent.futures import ProcessPoolExecutor
+
+# Optional: orjson reads and writes the JSON files several times faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# EXIF orientations that rotate the image by 90 degrees
+ROTATED_EXIF_ORIENTATIONS = {5, 6, 7, 8}
+
+def _json_loads(data):
+    """Parse JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _json_dumps(data):
+    """Serialize to indented UTF-8 JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+def read_image_size(image_path):
+    """Return (height, width) of an image, or None if it cannot be read"""
+    # Only the image header is parsed, the pixels are not decoded
+    try:
+        with Image.open(image_path) as image:
+            width, height = image.size
+            orientation = image.getexif().get(0x0112)  # EXIF Orientation tag
+    except Exception:
+        # Unreadable file, decompression bomb or corrupt EXIF: cv2.imread returned None too
+        return None
+    # Report the size as displayed, like cv2.imread which applies the EXIF rotation
+    if orientation in ROTATED_EXIF_ORIENTATIONS:
+        width, height = height, width
+    return height, width
+
+def _emit_labelme(task):
+    """Worker entry point: write the LabelMe JSON of one image and return a status message"""
+    image_filename, annotations, size, category_id_to_name, images_dir, output_dir = task
+
+    image_path = os.path.join(images_dir, "images", image_filename)
+
+    # Image dimensions (from the COCO JSON, else from the image file)
+    if size is None:
+        size = read_image_size(image_path)
+    if size is None:
+        return f"Error: Could not read image {image_path}"
+    height, width = size
+
+    # Convert all COCO bounding boxes for this image
+    shapes = []
+    for annotation in annotations:
+        x, y, bbox_width, bbox_height = annotation["bbox"]
+        category_id = annotation["category_id"]
+        label = category_id_to_name.get(category_id, str(category_id))  # Use name if available, else ID
+
+        # Start with a copy of the original annotation to preserve all custom fields
+        shape = annotation.copy()
+        
+        # Remove COCO-specific fields that don't belong in LabelMe
+        coco_specific_fields = ["id", "image_id", "category_id", "bbox", "area", "iscrowd", "segmentation"]
+        for field in coco_specific_fields:
+            shape.pop(field, None)
+        
+        # Add/override LabelMe-specific fields
+        shape.update({
+            "label": label,  # Now inherits from COCO category
+            "points": [[x, y], [x + bbox_width, y + bbox_height]],
+            "group_id": None,
+            "shape_type": "rectangle",
+            "flags": {}
+        })
+        
+        shapes.append(shape)
+
+    # Create LabelMe annotation structure
+    labelme_annotation = {
+        "version": "4.5.9",
+        "flags": {},
+        "shapes": shapes,
+        "imagePath": image_filename,  # <-- Only filename, no folder
+        "imageData": None,
+        "imageHeight": height,
+        "imageWidth": width
+    }
+
+    # Save LabelMe JSON
+    output_json_path = os.path.join(output_dir, "images", f"{os.path.splitext(image_filename)[0]}.json")
+    with open(output_json_path, "wb") as out_f:
+        out_f.write(_json_dumps(labelme_annotation))
+
+    return f"Saved: {output_json_path}"
+
+def coco_to_labelme(coco_json_path, images_dir, output_dir, executor=None):
+    """Convert a COCO JSON to LabelMe JSONs, one per image (in parallel if an executor is given)"""
     # Load COCO JSON
-    with open(coco_json_path, 'r', encoding='utf-8') as f:
-        coco_data = json.load(f)
+    with open(coco_json_path, 'rb') as f:
+        coco_data = _json_loads(f.read())
 
     # Validate COCO format
     required_keys = ["images", "annotations", "categories"]
@@ -17,12 +112,19 @@ def coco_to_labelme(coco_json_path, images_dir, output_dir):
             print(f"Warning: '{coco_json_path}' is not a valid COCO JSON (missing '{key}' key). Skipping.")
             return
 
-    # Create output directory if not exists
-    os.makedirs(output_dir, exist_ok=True)
+    # Create output directory (with its images subfolder) if not exists
+    os.makedirs(os.path.join(output_dir, "images"), exist_ok=True)
 
     # Map image IDs to filenames
     image_id_to_filename = {img["id"]: img["file_name"] for img in coco_data["images"]}
 
+    # Map image IDs to (height, width) where the COCO JSON already records them
+    image_id_to_size = {
+        img["id"]: (img["height"], img["width"])
+        for img in coco_data["images"]
+        if img.get("height") and img.get("width")
+    }
+
     # Map category_id to category name (if available)
     category_id_to_name = {cat["id"]: cat["name"] for cat in coco_data["categories"]}
 
@@ -32,67 +134,26 @@ def coco_to_labelme(coco_json_path, images_dir, output_dir):
         image_id = annotation["image_id"]
         image_annotations[image_id].append(annotation)
 
-    # Process each image
+    # Convert each image
+    tasks = []
     for image_id, annotations in image_annotations.items():
         image_filename = image_id_to_filename.get(image_id)
         if not image_filename:
             print(f"Warning: No image found for image_id {image_id}")
             continue
 
-        image_path = os.path.join(images_dir, "images", image_filename)
+        tasks.append((image_filename, annotations, image_id_to_size.get(image_id),
+                      category_id_to_name, images_dir, output_dir))
 
-        # Read image to get dimensions
-        image = cv2.imread(image_path)
-        if image is None:
-            print(f"Error: Could not read image {image_path}")
-            continue
-        height, width, _ = image.shape
-
-        # Convert all COCO bounding boxes for this image
-        shapes = []
-        for annotation in annotations:
-            x, y, bbox_width, bbox_height = annotation["bbox"]
-            category_id = annotation["category_id"]
-            label = category_id_to_name.get(category_id, str(category_id))  # Use name if available, else ID
-
-            # Start with a copy of the original annotation to preserve all custom fields
-            shape = annotation.copy()
-            
-            # Remove COCO-specific fields that don't belong in LabelMe
-            coco_specific_fields = ["id", "image_id", "category_id", "bbox", "area", "iscrowd", "segmentation"]
-            for field in coco_specific_fields:
-                shape.pop(field, None)
-            
-            # Add/override LabelMe-specific fields
-            shape.update({
-                "label": label,  # Now inherits from COCO category
-                "points": [[x, y], [x + bbox_width, y + bbox_height]],
-                "group_id": None,
-                "shape_type": "rectangle",
-                "flags": {}
-            })
-            
-            shapes.append(shape)
-
-        # Create LabelMe annotation structure
-        labelme_annotation = {
-            "version": "4.5.9",
-            "flags": {},
-            "shapes": shapes,
-            "imagePath": image_filename,  # <-- Only filename, no folder
-            "imageData": None,
-            "imageHeight": height,
-            "imageWidth": width
-        }
-
-        # Save LabelMe JSON
-        output_json_path = os.path.join(output_dir, "images", f"{os.path.splitext(image_filename)[0]}.json")
-        with open(output_json_path, "w", encoding="utf-8") as out_f:
-            json.dump(labelme_annotation, out_f, indent=4)
-
-        print(f"Saved: {output_json_path}")
-
-def process_directory_recursive(base_dir):
+    if executor is not None:
+        results = executor.map(_emit_labelme, tasks, chunksize=16)
+    else:
+        results = map(_emit_labelme, tasks)
+
+    for message in results:
+        print(message)
+
+def process_directory_recursive(base_dir, executor=None):
     """Recursively process directories looking for COCO JSON files"""
     for root, dirs, files in os.walk(base_dir):
         # Look for JSON files in current directory (but skip LabelMe JSON files)
@@ -110,27 +171,34 @@ def process_directory_recursive(base_dir):
             images_dir = root
             output_dir = root
             print(f"Processing: {coco_json_path}")
-            coco_to_labelme(coco_json_path, images_dir, output_dir)
+            coco_to_labelme(coco_json_path, images_dir, output_dir, executor)
+
+
+def main():
+    # Check command line arguments
+    if len(sys.argv) < 2:
+        print("Usage: python coco_to_labelme.py <output_base_dir>")
+        print("Example: python coco_to_labelme.py ../../census/anna_agi_export/output")
+        sys.exit(1)
 
+    # Get output base directory from command line argument
+    output_base_dir = sys.argv[1]
 
-# Check command line arguments
-if len(sys.argv) < 2:
-    print("Usage: python coco_to_labelme.py <output_base_dir>")
-    print("Example: python coco_to_labelme.py ../../census/anna_agi_export/output")
-    sys.exit(1)
+    # Check if the directory exists
+    if not os.path.exists(output_base_dir):
+        print(f"Error: Directory '{output_base_dir}' does not exist")
+        sys.exit(1)
 
-# Get output base directory from command line argument
-output_base_dir = sys.argv[1]
+    if not os.path.isdir(output_base_dir):
+        print(f"Error: '{output_base_dir}' is not a directory")
+        sys.exit(1)
 
-# Check if the directory exists
-if not os.path.exists(output_base_dir):
-    print(f"Error: Directory '{output_base_dir}' does not exist")
-    sys.exit(1)
+    print(f"Processing directory recursively: {output_base_dir}")
+    # The images are converted in parallel worker processes
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        process_directory_recursive(output_base_dir, executor)
+    print("Processing complete.")
 
-if not os.path.isdir(output_base_dir):
-    print(f"Error: '{output_base_dir}' is not a directory")
-    sys.exit(1)
 
-print(f"Processing directory recursively: {output_base_dir}")
-process_directory_recursive(output_base_dir)
-print("Processing complete.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
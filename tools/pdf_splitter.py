@@ -9,14 +9,25 @@ Description:
 - Recursively searches the input folder for all PDF files
 - For each PDF file found, creates a corresponding subfolder in the output directory
 - Converts each page of the PDF to a separate JPG image with high resolution (300 DPI)
+- Renders with poppler's pdftoppm (default) or with the in-process pdfium backend
+  (--backend pdfium); either way pages are written to disk one at a time, so memory use
+  does not grow with page count
+- --threads-per-pdf and the poppler-utils requirement below apply to the poppler backend only
 - Names the JPG files as: {pdf_name}_page{page_number}.jpg (e.g., "document_page1.jpg")
+- With --archive, stores the JPG files of each PDF in an uncompressed {pdf_name}.zip instead
+- With --max-dim, renders each page directly at the DPI that fits instead of resizing afterwards
 - Maintains the directory structure from input to output folder
-- Provides detailed progress information during processing
+- Shows a progress bar during processing (detailed per-page messages with --verbose)
 
 Requirements:
+- pypdfium2 library (optional, faster in-process rendering with --backend pdfium): pip install pypdfium2
 - pdf2image library: pip install pdf2image
-- Pillow library: pip install Pillow
-- poppler-utils (for pdf2image backend)
+- tqdm library (optional, progress bar): pip install tqdm
+- simplejpeg library (optional, faster JPEG encoding for the pdfium backend): pip install simplejpeg
+- Pillow library: pip install Pillow (installed with pdf2image)
+  - No page is resampled with PIL, so a drop-in Pillow-SIMD build gains little here;
+    if resizing is ever added, pip uninstall pillow && CC="cc -mavx2" pip install pillow-simd
+- poppler-utils (for the poppler backend only)
   - Windows: Download from https://github.com/oschwartz10612/poppler-windows
   - Linux: sudo apt-get install poppler-utils
   - macOS: brew install poppler
@@ -29,13 +40,339 @@ Example:
 """
 
 import os
+import re
 import sys
-from pdf2image import convert_from_path
-from PIL import Image
+import io
+import multiprocessing
+import shutil
+import zipfile
+from contextlib import redirect_stdout
+from functools import lru_cache
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import repeat
+from operator import itemgetter
+from pdf2image import convert_from_path, pdfinfo_from_path
 import argparse
 
+# Last page passed to pdfinfo to list the sizes of all pages (pdfinfo clamps it)
+PDFINFO_LAST_PAGE = 2**31 - 1
 
-def convert_pdf_to_jpg(pdf_path, output_folder, dpi=300, jpg_quality=95):
+# pdfinfo page size line, e.g. "Page    1 size: 595.276 x 841.89 pts (A4)"
+PAGE_SIZE_KEY_RE = re.compile(r'Page\s+(\d+) size')
+PAGE_SIZE_RE = re.compile(r'([\d.]+) x ([\d.]+) pts')
+
+# Placeholder for a page whose size pdfinfo did not report (fit_dpi keeps the DPI)
+UNKNOWN_PAGE_SIZE = (0.0, 0.0)
+
+# Threads encoding and writing JPGs while the pdfium backend renders the next page
+SAVE_THREADS = 4
+
+# Optional: tqdm shows a progress bar instead of per-page messages
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+# Optional: simplejpeg (libjpeg-turbo) encodes pdfium-rendered pages faster than PIL
+try:
+    import numpy as np
+    import simplejpeg
+except ImportError:
+    np = None
+    simplejpeg = None
+
+# PIL's subsampling values mapped to simplejpeg's names
+SIMPLEJPEG_SUBSAMPLING = {0: '444', 1: '422', 2: '420'}
+
+# Optional: pypdfium2 renders in-process and avoids spawning pdftoppm for every PDF
+try:
+    import pypdfium2 as pdfium
+    import pypdfium2.raw as pdfium_raw
+except ImportError:
+    pdfium = None
+    pdfium_raw = None
+
+
+def get_page_sizes(pdf_path, backend="poppler"):
+    """
+    Get the size of every page of a PDF in points (1/72 inch).
+    
+    With poppler this is a single pdfinfo call that provides both the page
+    count and the dimensions for logging, --max-dim and the skip check.
+    Results are cached per process until the PDF's modification time changes.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        backend (str): "poppler" (pdfinfo) or "pdfium" (pypdfium2)
+    
+    Returns:
+        tuple: (width, height) tuples, one per page; UNKNOWN_PAGE_SIZE for a page
+        whose size pdfinfo did not report
+    """
+    return _read_page_sizes(pdf_path, backend, os.path.getmtime(pdf_path))
+
+
+@lru_cache(maxsize=None)
+def _read_page_sizes(pdf_path, backend, mtime):
+    """
+    Uncached part of get_page_sizes; mtime is only part of the cache key.
+    """
+    if backend == "pdfium":
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            return tuple(pdf.get_page_size(index) for index in range(len(pdf)))
+        finally:
+            pdf.close()
+    
+    # pdfinfo clamps the last page to the page count, so this lists every page in one call
+    info = pdfinfo_from_path(pdf_path, first_page=1, last_page=PDFINFO_LAST_PAGE)
+    sizes_by_page = {}
+    for key, value in info.items():
+        key_match = PAGE_SIZE_KEY_RE.fullmatch(key)
+        size_match = PAGE_SIZE_RE.match(value) if key_match else None
+        if size_match:
+            sizes_by_page[int(key_match.group(1))] = (float(size_match.group(1)),
+                                                      float(size_match.group(2)))
+    
+    # The page count always comes from "Pages"; a page whose size line is missing or
+    # unparsable gets UNKNOWN_PAGE_SIZE instead of silently shortening the result
+    return tuple(sizes_by_page.get(page_num, UNKNOWN_PAGE_SIZE)
+                 for page_num in range(1, info["Pages"] + 1))
+
+
+def fit_dpi(dpi, max_dim, longest_side_pts):
+    """
+    Lower the DPI so that a page side of the given length fits into max_dim pixels.
+    
+    Rendering directly at the smaller DPI is much cheaper than rendering at full
+    resolution and downscaling, since the pixel work grows with the square of the DPI.
+    
+    Args:
+        dpi (int): Requested resolution
+        max_dim (int): Maximum number of pixels on the longest side (None or 0 for no limit)
+        longest_side_pts (float): Longest page side in points
+    
+    Returns:
+        int: The largest whole DPI not above dpi that keeps the page within max_dim
+    """
+    if not max_dim or longest_side_pts <= 0:
+        return dpi
+    return max(1, min(dpi, int(max_dim * 72 / longest_side_pts)))
+
+
+def outputs_up_to_date(pdf_path, output_folder, pdf_name, page_count, archive=False):
+    """
+    Check whether a previous run already produced every page of this PDF.
+    
+    The output counts as current when the folder (or the {output_folder}.zip
+    archive) holds one {pdf_name}_page{n}.jpg per PDF page and none of them is
+    older than the PDF itself.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        output_folder (str): Directory where the JPG files are saved
+        pdf_name (str): PDF filename without extension
+        page_count (int): Number of pages of the PDF
+        archive (bool): Check the per-PDF zip archive instead of the folder
+    
+    Returns:
+        bool: True if the conversion can be skipped
+    """
+    page_re = re.compile(re.escape(pdf_name) + r'_page\d+\.jpg')
+    pdf_mtime = os.path.getmtime(pdf_path)
+    existing = 0
+    
+    if archive:
+        archive_path = output_folder + ".zip"
+        if not os.path.isfile(archive_path) or os.path.getmtime(archive_path) < pdf_mtime:
+            return False
+        with zipfile.ZipFile(archive_path) as zip_file:
+            existing = sum(1 for name in zip_file.namelist() if page_re.fullmatch(name))
+    else:
+        if not os.path.isdir(output_folder):
+            return False
+        with os.scandir(output_folder) as entries:
+            for entry in entries:
+                if page_re.fullmatch(entry.name):
+                    if entry.stat().st_mtime < pdf_mtime:
+                        return False
+                    existing += 1
+    
+    return existing > 0 and existing == page_count
+
+
+def _convert_with_poppler(pdf_path, output_folder, pdf_name, dpi, jpg_quality, thread_count,
+                          optimize=False, zip_file=None, verbose=True, total_pages=None):
+    """
+    Rasterize and encode all pages with poppler's pdftoppm (via pdf2image).
+    
+    pdftoppm has no subsampling option; libjpeg's default of 4:2:0 is used.
+    With zip_file, the pages are stored in the archive instead of output_folder.
+    Pages are logged as "page i/total_pages" (from pdfinfo) since the images are
+    never opened here.
+    
+    Returns:
+        int: Number of pages saved
+    """
+    # Let poppler write the JPGs directly into a scratch folder next to the
+    # final files, so no page is ever held in memory as a PIL image. The folder
+    # is named after the PDF, so one left behind by a killed run is cleared here.
+    scratch_parent = output_folder if zip_file is None else os.path.dirname(output_folder)
+    temp_folder = os.path.join(scratch_parent, f".pdf2image-{pdf_name}")
+    shutil.rmtree(temp_folder, ignore_errors=True)
+    os.makedirs(temp_folder)
+    try:
+        page_paths = convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            thread_count=thread_count,
+            output_folder=temp_folder,
+            fmt="jpeg",
+            jpegopt={"quality": jpg_quality, "optimize": optimize, "progressive": False},
+            paths_only=True
+        )
+        
+        # Move each page into place under its final name (paths are in page order)
+        for page_num, page_path in enumerate(page_paths, start=1):
+            jpg_filename = f"{pdf_name}_page{page_num}.jpg"
+            jpg_size = os.path.getsize(page_path)
+            
+            if zip_file is not None:
+                zip_file.write(page_path, jpg_filename)
+            else:
+                os.replace(page_path, os.path.join(output_folder, jpg_filename))
+            if verbose:
+                print(f"    Saved: {jpg_filename} (page {page_num}/{total_pages or len(page_paths)}, "
+                      f"{jpg_size // 1024} KB)")
+        
+        return len(page_paths)
+    
+    finally:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+
+def page_has_images(page):
+    """
+    Check whether a pdfium page draws any raster image (also inside form XObjects).
+    
+    Args:
+        page (pypdfium2.PdfPage): Page to inspect
+    
+    Returns:
+        bool: True if the page contains at least one image object
+    """
+    # get_objects is a generator, so the walk stops at the first image object
+    image_objects = page.get_objects(filter=[pdfium_raw.FPDF_PAGEOBJ_IMAGE])
+    return next(image_objects, None) is not None
+
+
+def _save_jpg(image, jpg_path, save_options):
+    """
+    Encode a page image as JPEG.
+    
+    Uses simplejpeg with the fast DCT when it is installed. PIL is the fallback,
+    and is also used for optimize=True since simplejpeg has no Huffman
+    optimization pass.
+    
+    Args:
+        image (PIL.Image.Image): Rendered page
+        jpg_path (str): Destination file, or None to return the encoded bytes
+        save_options (dict): Keyword arguments for PIL's JPEG encoder
+    
+    Returns:
+        bytes: The JPEG data if jpg_path is None, otherwise None
+    """
+    if simplejpeg is not None and image.mode == "RGB" and not save_options["optimize"]:
+        jpg_data = simplejpeg.encode_jpeg(
+            np.asarray(image),
+            quality=save_options["quality"],
+            colorspace='RGB',
+            colorsubsampling=SIMPLEJPEG_SUBSAMPLING[save_options["subsampling"]],
+            fastdct=True
+        )
+        if jpg_path is None:
+            return jpg_data
+        with open(jpg_path, 'wb') as f:
+            f.write(jpg_data)
+        return None
+    
+    if jpg_path is None:
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", **save_options)
+        return buffer.getvalue()
+    
+    image.save(jpg_path, "JPEG", **save_options)
+    return None
+
+
+def _convert_with_pdfium(pdf_path, output_folder, pdf_name, dpi, jpg_quality, max_dim=None,
+                         subsampling=2, optimize=False, zip_file=None, verbose=True,
+                         text_dpi=None):
+    """
+    Render all pages in-process with PDFium (pypdfium2) and encode them with
+    simplejpeg (or PIL if it is not installed).
+    
+    JPEG encoding and writing run on a small thread pool while the next page is
+    rendered (both release the GIL). At most SAVE_THREADS rendered pages wait to
+    be saved, so memory use stays bounded.
+    With max_dim, each page gets its own DPI so that its longest side fits.
+    With text_dpi, pages without raster images (pure text and vector graphics) are
+    rendered at that lower DPI (never above dpi), since they gain nothing from the full resolution.
+    With zip_file, the pages are encoded in memory and stored in the archive.
+    
+    Returns:
+        int: Number of pages saved
+    """
+    # Single baseline pass; optimize adds a second Huffman pass for smaller files
+    save_options = {
+        "quality": jpg_quality,
+        "subsampling": subsampling,
+        "optimize": optimize,
+        "progressive": False,
+    }
+    
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        page_count = len(pdf)
+        with ThreadPoolExecutor(max_workers=SAVE_THREADS) as save_pool:
+            pending_saves = deque()
+            for page_num in range(1, page_count + 1):
+                page = pdf[page_num - 1]
+                base_dpi = dpi
+                if text_dpi and not page_has_images(page):
+                    base_dpi = min(dpi, text_dpi)
+                page_dpi = fit_dpi(base_dpi, max_dim, max(page.get_size()))
+                image = page.render(scale=page_dpi / 72).to_pil()
+                page.close()
+                
+                jpg_filename = f"{pdf_name}_page{page_num}.jpg"
+                jpg_path = None if zip_file is not None else os.path.join(output_folder, jpg_filename)
+                
+                future = save_pool.submit(_save_jpg, image, jpg_path, save_options)
+                pending_saves.append((page_num, jpg_filename, image.size, future))
+                
+                # Wait for the oldest saves (re-raising their errors) once enough are queued;
+                # archive entries are written here, in page order, by this thread only
+                while pending_saves and (len(pending_saves) > SAVE_THREADS or page_num == page_count):
+                    saved_num, jpg_filename, (width, height), future = pending_saves.popleft()
+                    jpg_data = future.result()
+                    if zip_file is not None:
+                        zip_file.writestr(jpg_filename, jpg_data)
+                    if verbose:
+                        print(f"    Saved: {jpg_filename} (page {saved_num}/{page_count}, "
+                              f"{width}x{height} pixels)")
+        
+        return page_count
+    
+    finally:
+        pdf.close()
+
+
+def convert_pdf_to_jpg(pdf_path, output_folder, dpi=300, jpg_quality=95, thread_count=1,
+                       skip_existing=False, backend="poppler", max_dim=None, subsampling=2,
+                       optimize=False, archive=False, verbose=True, create_folders=True,
+                       text_dpi=None, page_sizes=None):
     """
     Convert a single PDF file to JPG images.
     
@@ -44,32 +381,81 @@ def convert_pdf_to_jpg(pdf_path, output_folder, dpi=300, jpg_quality=95):
         output_folder (str): Directory where JPG files will be saved
         dpi (int): Resolution for the conversion (default: 300)
         jpg_quality (int): JPG compression quality 1-100 (default: 95)
+        thread_count (int): Number of poppler threads rasterizing pages of this PDF (default: 1)
+        skip_existing (bool): Skip the PDF if its JPGs are already complete and newer (default: False)
+        backend (str): "poppler" (pdftoppm subprocess) or "pdfium" (in-process pypdfium2)
+        max_dim (int): Lower the DPI so the longest page side is at most this many pixels
+        subsampling (int): JPEG chroma subsampling, 0=4:4:4, 1=4:2:2, 2=4:2:0 (pdfium backend)
+        optimize (bool): Run the extra Huffman optimization pass (default: False)
+        archive (bool): Store the JPGs in an uncompressed {output_folder}.zip instead (default: False)
+        verbose (bool): Print progress messages; errors are always printed (default: True)
+        create_folders (bool): Create the output folder first; callers that created it
+            already can skip this (default: True)
+        text_dpi (int): Resolution for pages without raster images (pdfium backend only)
+        page_sizes (tuple): Page sizes from get_page_sizes, if the caller already has them
     
     Returns:
         bool: True if successful, False if failed
     """
+    # Get PDF filename without extension for naming JPGs
+    pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    
     try:
-        print(f"  Converting PDF: {os.path.basename(pdf_path)}")
+        # One pdfinfo call (or PDFium open) provides the page count and all page sizes
+        if page_sizes is None:
+            page_sizes = get_page_sizes(pdf_path, backend)
         
-        # Convert PDF to PIL Image objects
-        pages = convert_from_path(pdf_path, dpi=dpi)
+        if skip_existing and outputs_up_to_date(pdf_path, output_folder, pdf_name,
+                                                len(page_sizes), archive):
+            if verbose:
+                print(f"  ↷ Skipped {os.path.basename(pdf_path)}: JPGs are up to date")
+            return True
         
-        # Get PDF filename without extension for naming JPGs
-        pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        if verbose:
+            print(f"  Converting PDF: {os.path.basename(pdf_path)}")
         
-        # Create output folder if it doesn't exist
-        os.makedirs(output_folder, exist_ok=True)
+        if archive:
+            # One uncompressed zip per PDF instead of a folder of small files; it is
+            # written under a temporary name so an interrupted run leaves no valid archive
+            archive_path = output_folder + ".zip"
+            partial_path = archive_path + ".part"
+            if create_folders:
+                os.makedirs(os.path.dirname(archive_path) or ".", exist_ok=True)
+            zip_file = zipfile.ZipFile(partial_path, "w", zipfile.ZIP_STORED)
+        else:
+            # Create output folder if it doesn't exist
+            if create_folders:
+                os.makedirs(output_folder, exist_ok=True)
+            zip_file = None
         
-        # Save each page as JPG
-        for page_num, page in enumerate(pages, start=1):
-            jpg_filename = f"{pdf_name}_page{page_num}.jpg"
-            jpg_path = os.path.join(output_folder, jpg_filename)
-            
-            # Save with high quality
-            page.save(jpg_path, "JPEG", quality=jpg_quality, optimize=True)
-            print(f"    Saved: {jpg_filename} ({page.size[0]}x{page.size[1]} pixels)")
+        try:
+            if backend == "pdfium":
+                page_count = _convert_with_pdfium(pdf_path, output_folder, pdf_name, dpi,
+                                                  jpg_quality, max_dim, subsampling, optimize,
+                                                  zip_file, verbose, text_dpi)
+            else:
+                if max_dim:
+                    # pdftoppm renders the whole PDF at one DPI, so fit the largest page
+                    longest_side = max((max(size) for size in page_sizes), default=0)
+                    page_dpi = fit_dpi(dpi, max_dim, longest_side)
+                    if verbose and page_dpi < dpi:
+                        print(f"    Rendering at {page_dpi} DPI to fit {max_dim} pixels")
+                    dpi = page_dpi
+                page_count = _convert_with_poppler(pdf_path, output_folder, pdf_name, dpi,
+                                                   jpg_quality, thread_count, optimize, zip_file,
+                                                   verbose, len(page_sizes))
+        except BaseException:
+            if zip_file is not None:
+                zip_file.close()
+                os.remove(partial_path)
+            raise
+        
+        if zip_file is not None:
+            zip_file.close()
+            os.replace(partial_path, archive_path)
         
-        print(f"  ✓ Successfully converted {len(pages)} pages from {os.path.basename(pdf_path)}")
+        if verbose:
+            print(f"  ✓ Successfully converted {page_count} pages from {os.path.basename(pdf_path)}")
         return True
         
     except Exception as e:
@@ -77,59 +463,273 @@ def convert_pdf_to_jpg(pdf_path, output_folder, dpi=300, jpg_quality=95):
         return False
 
 
-def process_pdfs_recursive(input_folder, output_folder, dpi=300, jpg_quality=95):
+def _convert_job(pdf_path, output_folder, convert_options, page_sizes=None):
+    """
+    Worker entry point: convert one PDF in a child process.
+    
+    The messages of the conversion are captured and returned so that the
+    output of PDFs converted at the same time does not interleave.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        output_folder (str): Directory where JPG files will be saved
+        convert_options (dict): Keyword arguments for convert_pdf_to_jpg
+        page_sizes (tuple): Page sizes read by the main process (None to read them here)
+    
+    Returns:
+        tuple: (success, captured_output)
+    """
+    # The main process only created the output folders of PDFs it could read;
+    # for the others the folder is made once the conversion gets that far
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        success = convert_pdf_to_jpg(pdf_path, output_folder, page_sizes=page_sizes,
+                                     create_folders=page_sizes is None, **convert_options)
+    return success, buffer.getvalue()
+
+
+def iter_pdfs(folder):
+    """
+    Recursively yield the paths of all PDF files below a folder.
+    
+    Uses os.scandir, whose entries already carry the file type, so only names
+    are compared and no extra stat call is needed. Symlinked directories are
+    not followed and unreadable directories are skipped, as with os.walk.
+    
+    Args:
+        folder (str): Directory to search
+    
+    Yields:
+        str: Path of each PDF file
+    """
+    try:
+        entries = os.scandir(folder)
+    except OSError:
+        return
+    
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_pdfs(entry.path)
+            elif entry.name.lower().endswith('.pdf') and entry.is_file():
+                yield entry.path
+
+
+def collect_pdf_jobs(input_folder, output_folder):
+    """
+    Find all PDF files below the input folder in a single traversal.
+    
+    Each PDF gets the output folder output_folder/<relative dir>/<pdf name>,
+    so the directory structure of the input is kept.
+    
+    Args:
+        input_folder (str): Root directory containing PDF files
+        output_folder (str): Root directory for output JPG files
+    
+    Returns:
+        list: (pdf_path, pdf_output_folder) tuples
+    """
+    jobs = []
+    for pdf_path in iter_pdfs(input_folder):
+        relative_path = os.path.relpath(pdf_path, input_folder)
+        pdf_output_folder = os.path.join(output_folder, os.path.splitext(relative_path)[0])
+        jobs.append((pdf_path, pdf_output_folder))
+    
+    return jobs
+
+
+def _skip_if_up_to_date(pdf_path, output_folder, sizes, archive):
+    """
+    Check in the main process whether a PDF's previous output can be kept.
+    
+    PDFs that could not be read and outputs that cannot be inspected (e.g. a
+    damaged archive) are converted again, which reports or replaces them.
+    """
+    if sizes is None:
+        return False
+    pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    try:
+        return outputs_up_to_date(pdf_path, output_folder, pdf_name, len(sizes), archive)
+    except Exception:
+        return False
+
+
+def _scan_page_sizes(pdf_path, backend):
+    """
+    Get the page sizes of a PDF for scheduling, or None if it cannot be read.
+    
+    Unreadable PDFs are reported by the conversion itself.
+    """
+    try:
+        return get_page_sizes(pdf_path, backend)
+    except Exception:
+        return None
+
+
+def scan_page_sizes(pdf_paths, backend="poppler", workers=1):
+    """
+    Get the page sizes of many PDFs without rasterizing anything.
+    
+    With poppler, the pdfinfo calls run on a thread pool. PDFium is not thread-safe,
+    so those PDFs are opened one after the other (which is fast, as it is in-process).
+    
+    Args:
+        pdf_paths (list): Paths to the PDF files
+        backend (str): "poppler" or "pdfium"
+        workers (int): Number of concurrent pdfinfo calls
+    
+    Returns:
+        list: Page sizes per PDF (None for unreadable PDFs), in the order of pdf_paths
+    """
+    if backend == "pdfium":
+        return [_scan_page_sizes(pdf_path, backend) for pdf_path in pdf_paths]
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_scan_page_sizes, pdf_paths, repeat(backend)))
+
+
+def process_pdfs_recursive(input_folder, output_folder, dpi=300, jpg_quality=95, workers=None,
+                           threads_per_pdf=1, skip_existing=False, backend="poppler",
+                           max_dim=None, subsampling=2, optimize=False, archive=False,
+                           verbose=True, text_dpi=None):
     """
     Recursively process all PDF files in the input folder.
     
+    All PDFs are collected in one traversal first and then converted in parallel
+    worker processes, largest PDFs (by page count) first.
+    
     Args:
         input_folder (str): Root directory containing PDF files
         output_folder (str): Root directory for output JPG files
         dpi (int): Resolution for PDF conversion
         jpg_quality (int): JPG compression quality
+        workers (int): Number of PDFs converted in parallel (default: number of CPUs)
+        threads_per_pdf (int): Number of poppler threads rasterizing pages of one PDF
+        skip_existing (bool): Skip PDFs whose JPGs are already complete and newer than
+            the PDF; the conversion settings of the earlier run are not compared
+        backend (str): Rendering backend, "poppler" or "pdfium"
+        max_dim (int): Maximum number of pixels on the longest side of a page
+        subsampling (int): JPEG chroma subsampling (pdfium backend)
+        optimize (bool): Run the extra JPEG Huffman optimization pass
+        archive (bool): Write one uncompressed zip per PDF instead of a folder of JPGs
+        verbose (bool): Print per-directory and per-page messages; otherwise show a
+            progress bar (if tqdm is installed) and only report errors
+        text_dpi (int): Resolution for pages without raster images (pdfium backend)
     
     Returns:
-        tuple: (total_pdfs_found, successful_conversions, failed_conversions)
+        tuple: (total_pdfs_found, successful_conversions, failed_conversions, skipped_pdfs)
     """
-    total_pdfs = 0
     successful = 0
     failed = 0
+    skipped = 0
     
     print(f"Scanning for PDF files in: {input_folder}")
     print(f"Output directory: {output_folder}")
     print("-" * 60)
     
-    # Walk through all directories and subdirectories
-    for root, dirs, files in os.walk(input_folder):
-        # Calculate relative path to maintain directory structure
-        relative_path = os.path.relpath(root, input_folder)
-        if relative_path == '.':
-            relative_path = ''
-        
-        # Process all PDF files in current directory
-        pdf_files = [f for f in files if f.lower().endswith('.pdf')]
+    jobs = collect_pdf_jobs(input_folder, output_folder)
+    
+    # Report how many PDFs were found per directory
+    if verbose:
+        pdfs_per_folder = Counter(os.path.dirname(pdf_path) for pdf_path, _ in jobs)
+        for folder, count in pdfs_per_folder.items():
+            print(f"Found {count} PDF file(s) in: {folder}")
+    
+    total_pdfs = len(jobs)
+    if not jobs:
+        return total_pdfs, successful, failed, skipped
+    
+    workers = workers or os.cpu_count() or 1
+    
+    # Read every PDF's page sizes once here and pass them on to the workers, which use
+    # them for scheduling, --max-dim and logging. (pdf2image still runs its own
+    # pdfinfo inside convert_from_path; it offers no way to pass the page count in.)
+    page_sizes = scan_page_sizes([pdf_path for pdf_path, _ in jobs], backend, workers)
+    
+    # Leave out the PDFs whose output is already complete, so they need no worker job
+    if skip_existing:
+        pending = []
+        for (pdf_path, pdf_output_folder), sizes in zip(jobs, page_sizes):
+            if _skip_if_up_to_date(pdf_path, pdf_output_folder, sizes, archive):
+                skipped += 1
+                if verbose:
+                    print(f"  ↷ Skipped {os.path.basename(pdf_path)}: JPGs are up to date")
+            else:
+                pending.append(((pdf_path, pdf_output_folder), sizes))
+        jobs = [job for job, _ in pending]
+        page_sizes = [sizes for _, sizes in pending]
+        if not jobs:
+            return total_pdfs, successful, failed, skipped
+    
+    page_counts = [len(sizes) if sizes is not None else 0 for sizes in page_sizes]
+    
+    # Longest-processing-time-first: start the PDFs with the most pages first, so the
+    # batch does not end with one large PDF running alone while the other workers idle
+    jobs = [
+        (pdf_path, pdf_output_folder, sizes)
+        for _, (pdf_path, pdf_output_folder), sizes
+        in sorted(zip(page_counts, jobs, page_sizes), key=itemgetter(0), reverse=True)
+    ]
+    
+    print(f"\nConverting {len(jobs)} PDF file(s) with {sum(page_counts)} page(s)...")
+    
+    # Create the output folders here once, instead of in every worker job. PDFs the
+    # pre-scan could not read get no folder, so a corrupt PDF leaves nothing behind
+    if archive:
+        job_folders = {os.path.dirname(pdf_output_folder)
+                       for _, pdf_output_folder, sizes in jobs if sizes is not None}
+    else:
+        job_folders = {pdf_output_folder
+                       for _, pdf_output_folder, sizes in jobs if sizes is not None}
+    for folder in job_folders:
+        os.makedirs(folder, exist_ok=True)
+    
+    convert_options = {
+        "dpi": dpi,
+        "jpg_quality": jpg_quality,
+        "thread_count": threads_per_pdf,
+        "backend": backend,
+        "max_dim": max_dim,
+        "subsampling": subsampling,
+        "optimize": optimize,
+        "archive": archive,
+        "verbose": verbose,
+        "text_dpi": text_dpi,
+    }
+    
+    # Convert the PDFs in parallel (rasterization is CPU-bound and independent per PDF).
+    # Jobs are submitted one by one in LPT order; chunking would hand the largest PDFs
+    # to the same worker.
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_convert_job, pdf_path, pdf_output_folder, convert_options, sizes)
+            for pdf_path, pdf_output_folder, sizes in jobs
+        ]
         
-        if pdf_files:
-            print(f"\nProcessing directory: {root}")
-            print(f"Found {len(pdf_files)} PDF file(s)")
+        # One progress bar instead of a line per page, unless the full log was asked for
+        progress = None
+        if not verbose and tqdm is not None:
+            progress = tqdm(total=len(jobs), unit="pdf", desc="Converting")
         
-        for pdf_file in pdf_files:
-            total_pdfs += 1
-            pdf_path = os.path.join(root, pdf_file)
-            
-            # Create corresponding output directory structure
-            pdf_name = os.path.splitext(pdf_file)[0]
-            if relative_path:
-                pdf_output_folder = os.path.join(output_folder, relative_path, pdf_name)
-            else:
-                pdf_output_folder = os.path.join(output_folder, pdf_name)
-            
-            # Convert the PDF
-            if convert_pdf_to_jpg(pdf_path, pdf_output_folder, dpi, jpg_quality):
+        for future in as_completed(futures):
+            success, output = future.result()
+            if success:
                 successful += 1
             else:
                 failed += 1
+            
+            if progress is not None:
+                if output:
+                    progress.write(output, end="")
+                progress.update(1)
+                progress.set_postfix(ok=successful, failed=failed)
+            else:
+                print(output, end="")
+        
+        if progress is not None:
+            progress.close()
     
-    return total_pdfs, successful, failed
+    return total_pdfs, successful, failed, skipped
 
 
 def main():
@@ -153,10 +753,60 @@ Examples:
                        help='Resolution for PDF conversion (default: 300)')
     parser.add_argument('--quality', type=int, default=95, choices=range(1, 101),
                        help='JPG quality 1-100 (default: 95)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                       help='Number of PDFs converted in parallel (default: number of CPUs)')
+    parser.add_argument('--threads-per-pdf', type=int, default=1,
+                       help='Poppler threads rasterizing the pages of one PDF (default: 1, '
+                            'poppler backend only); '
+                            'keep workers x threads-per-pdf close to the number of CPUs')
+    parser.add_argument('--skip-existing', action='store_true',
+                       help='Skip PDFs whose JPGs are already complete and newer than the PDF. '
+                            'Only the page count and modification times are checked, so do not '
+                            'combine with changed --dpi, --quality or other rendering options')
+    parser.add_argument('--backend', choices=['poppler', 'pdfium'],
+                       default='poppler',
+                       help='Rendering backend: poppler\'s pdftoppm or in-process pypdfium2, '
+                            'which is faster but renders slightly differently (default: poppler)')
+    parser.add_argument('--text-dpi', type=int, default=None,
+                       help='Lower resolution for pages without raster images (text and vector '
+                            'graphics only), e.g. 150; must not exceed --dpi, pages with '
+                            'images keep --dpi (pdfium backend only)')
+    parser.add_argument('--max-dim', type=int, default=None,
+                       help='Maximum pixels on the longest page side. Pages are rendered at the '
+                            'highest DPI (up to --dpi) that fits, which is much cheaper than '
+                            'rendering at full DPI and downscaling; small pages are not upscaled')
+    parser.add_argument('--subsampling', type=int, default=2, choices=[0, 1, 2],
+                       help='JPEG chroma subsampling: 0=4:4:4, 1=4:2:2, 2=4:2:0 (default: 2; '
+                            'pdfium backend, poppler always uses 4:2:0)')
+    parser.add_argument('--optimize', action=argparse.BooleanOptionalAction, default=False,
+                       help='Run the extra Huffman optimization pass: slightly smaller files, '
+                            'roughly twice the encode time (default: off)')
+    parser.add_argument('--archive', action='store_true',
+                       help='Store the pages of each PDF in one uncompressed <pdf_name>.zip '
+                            'instead of a folder of JPG files (far fewer file creations on '
+                            'network or slow filesystems)')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                       help='Print a message per directory and per page instead of a progress bar')
     
     # Parse arguments
     args = parser.parse_args()
     
+    if args.backend == 'pdfium' and pdfium is None:
+        print("Error: The pdfium backend requires pypdfium2 (pip install pypdfium2).")
+        sys.exit(1)
+    
+    if args.threads_per_pdf > 1 and args.backend == 'pdfium':
+        print("Warning: --threads-per-pdf only applies to the poppler backend and is ignored; "
+              "use --workers to convert more PDFs in parallel.")
+    
+    if args.text_dpi and args.backend != 'pdfium':
+        print("Error: --text-dpi needs the pdfium backend to detect pages without images.")
+        sys.exit(1)
+    
+    if args.text_dpi and args.text_dpi > args.dpi:
+        print(f"Error: --text-dpi ({args.text_dpi}) must not exceed --dpi ({args.dpi}).")
+        sys.exit(1)
+    
     # Validate input folder
     if not os.path.exists(args.input_folder):
         print(f"Error: Input folder '{args.input_folder}' does not exist.")
@@ -178,16 +828,32 @@ Examples:
     print(f"Input folder: {os.path.abspath(args.input_folder)}")
     print(f"Output folder: {os.path.abspath(args.output_folder)}")
     print(f"Resolution: {args.dpi} DPI")
-    print(f"JPG Quality: {args.quality}%")
+    if args.text_dpi:
+        print(f"Resolution for pages without images: {args.text_dpi} DPI")
+    if args.max_dim:
+        print(f"Max dimension: {args.max_dim} pixels")
+    print(f"JPG Quality: {args.quality}% (subsampling: {args.subsampling}, optimize: {args.optimize})")
+    print(f"Backend: {args.backend}")
+    print(f"Workers: {args.workers} (threads per PDF: {args.threads_per_pdf})")
     print("=" * 60)
     
     # Process all PDFs
     try:
-        total, successful, failed = process_pdfs_recursive(
+        total, successful, failed, skipped = process_pdfs_recursive(
             args.input_folder, 
             args.output_folder, 
             args.dpi, 
-            args.quality
+            args.quality,
+            max(1, args.workers),
+            max(1, args.threads_per_pdf),
+            args.skip_existing,
+            args.backend,
+            args.max_dim,
+            args.subsampling,
+            args.optimize,
+            args.archive,
+            args.verbose,
+            args.text_dpi
         )
         
         # Print summary
@@ -196,6 +862,7 @@ Examples:
         print("=" * 60)
         print(f"Total PDF files found: {total}")
         print(f"Successfully converted: {successful}")
+        print(f"Skipped (already up to date): {skipped}")
         print(f"Failed conversions: {failed}")
         
         if failed == 0:
@@ -214,4 +881,5 @@ Examples:
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file